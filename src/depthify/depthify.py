@@ -4,7 +4,7 @@ import typing
 import logging
 
 import numpy as np
-from scipy.interpolate import griddata
+from numba import njit, prange
 
 import pyqtgraph as pg
 from PyQt5 import QtCore, QtGui, QtWidgets
@@ -13,6 +13,29 @@ from depthify.gui_utils import *
 from depthify.depthify_utils import *
 
 
+@njit(parallel=True, fastmath=True, cache=True)
+def _idw_kernel(px: np.ndarray, py: np.ndarray, depths: np.ndarray,
+                num: np.ndarray, den: np.ndarray):
+    '''
+    Computes the inverse-distance-weighting numerator and denominator of
+    all points at once, streaming over the points per pixel instead of
+    materializing a (height, width, N) distance tensor.
+    '''
+    height, width = num.shape
+    for i in prange(height):
+        for j in range(width):
+            num_ij = 0.0
+            den_ij = 0.0
+            for k in range(px.shape[0]):
+                dx = j - px[k]
+                dy = i - py[k]
+                w = 1.0 / (dx*dx + dy*dy + 1e-12)
+                num_ij += w * depths[k]
+                den_ij += w
+            num[i, j] = num_ij
+            den[i, j] = den_ij
+
+
 class ImageWithPoints(ClickableImageViewer):
     def __init__(self,
                  parent: typing.Optional[QtWidgets.QWidget] = None,
@@ -44,15 +67,51 @@ class ImageWithPoints(ClickableImageViewer):
         # paint image
         super().paintEvent(event)
 
-        # paint points over it
+        if not self._points:
+            return
+
+        # group the points by color, so each pen is only set up once
+        default = QtGui.QColor(QtCore.Qt.GlobalColor.red)
+        groups: dict[int, tuple[QtGui.QColor, list[QtCore.QPointF]]] = {}
+        for pt, col in self._points:
+            col = col or default
+            group = groups.setdefault(col.rgba(), (col, []))
+            group[1].append(self._img_to_px(pt) + self._rect.topLeft())
+
+        # paint points over it, one batch per color
         with QtGui.QPainter(self) as p:
             p: QtGui.QPainter
-            for pt, col in self._points:
-                p.setPen(QtGui.QPen(col or QtCore.Qt.GlobalColor.red, 5))
-                p.setBrush(col or QtCore.Qt.GlobalColor.red)
-                p.drawPoint(self._img_to_px(pt) + self._rect.topLeft())
-                # p.drawEllipse(QtCore.QRectF(
-                #     self._img_to_px(pt), QtCore.QSizeF(5, 5)))
+            for col, points in groups.values():
+                p.setPen(QtGui.QPen(col, 5))
+                p.setBrush(col)
+                p.drawPoints(QtGui.QPolygonF(points))
+
+
+class DepthWorker(QtCore.QObject):
+    """
+    Computes the depth map and its colormapped image from the IDW
+    accumulators. Intended to be moved to its own thread, so the heavy
+    per-pixel work doesn't block the GUI.
+    """
+    resultReady = QtCore.pyqtSignal(int, QtGui.QImage, np.ndarray)
+
+    def compute(self, generation: int,
+                num: np.ndarray, den: np.ndarray, lut: np.ndarray):
+        '''turn the IDW accumulators into a depth map and colormapped image'''
+        z = num / den
+        # guard against non-finite values from degenerate accumulators
+        np.nan_to_num(z, copy=False, nan=255.0)
+        np.clip(z, 0, 255, out=z)
+        np.rint(z, out=z)
+        depth_map = z.astype(np.uint8)
+        depth_image = lut[depth_map]
+        height, width = depth_map.shape
+        # the image is copied so it owns its pixels once it crosses the
+        # thread boundary (the buffer backing the view dies with compute)
+        image = QtGui.QImage(depth_image.data, width, height,
+                             depth_image.strides[0],
+                             QtGui.QImage.Format.Format_RGBA8888).copy()
+        self.resultReady.emit(generation, image, depth_map)
 
 
 class DepthViewer(ImageViewer):
@@ -77,44 +136,132 @@ class DepthViewer(ImageViewer):
         clear() -> None:
             Removes all points from the depth map and clears the displayed image.
 
+    Signals:
+        depthMapChanged: emitted whenever a freshly computed depth map
+            has been taken over from the background worker.
+
     """
+    requestCompute = QtCore.pyqtSignal(int, np.ndarray, np.ndarray, np.ndarray)
+    depthMapChanged = QtCore.pyqtSignal()
 
     def __init__(self, parent: typing.Optional[QtWidgets.QWidget] = None,
                  flags: typing.Union[QtCore.Qt.WindowFlags,
                                      QtCore.Qt.WindowType] = QtCore.Qt.WindowType.Widget) -> None:
         super().__init__(parent, flags)
         self._points: list[tuple[tuple[float, float], float]] = list()
-        self._image_size = QtCore.QSize(50, 50)
-        self._cmap: pg.ColorMap = pg.colormap.get("viridis")  # type: ignore
+        # the same points & depths, kept as arrays ready for interpolation
+        self._px = np.empty(0, np.float32)
+        self._py = np.empty(0, np.float32)
+        self._depths = np.empty(0, np.float32)
         self._depth_map: typing.Optional[np.ndarray] = None
+        # generation id of the newest dispatched compute, so that stale
+        # results coming back from the worker can be recognized
+        self._generation = 0
+        self.setImageSize(QtCore.QSize(50, 50))
+        self.setColorMap(pg.colormap.get("viridis"))  # type: ignore
+
+        # the heavy per-pixel work runs on a background thread; the
+        # finished image is delivered back through a queued signal
+        self._worker = DepthWorker()
+        self._worker_thread = QtCore.QThread(self)
+        self._worker.moveToThread(self._worker_thread)
+        self.requestCompute.connect(self._worker.compute)
+        self._worker.resultReady.connect(self._applyResult)
+        self._worker_thread.start()
+
+    def stopWorker(self):
+        '''Shuts down the background compute thread.'''
+        self._worker_thread.quit()
+        self._worker_thread.wait()
 
     def setImageSize(self, size: QtCore.QSize):
         '''Sets the size of the image to be displayed.'''
         self._image_size = size
+        # (re-)allocate the persistent buffers reused across updates
+        height, width = size.height(), size.width()
+        # running IDW numerator/denominator, plus the coordinate grid
+        # they are accumulated over
+        self._y, self._x = np.ogrid[:height, :width]
+        self._idw_num = np.zeros((height, width))
+        self._idw_den = np.zeros((height, width))
+        # blank map shown while there are too few points; lazily rebuilt
+        # by updateDepthMap for the new image size
+        self._blank_array: typing.Optional[np.ndarray] = None
+        self._blank_qimage: typing.Optional[QtGui.QImage] = None
+        self._dirty = True
+        self._generation += 1  # any in-flight compute is now stale
+        if len(self._points):
+            _idw_kernel(self._px, self._py, self._depths,
+                        self._idw_num, self._idw_den)
+
+    def _foldPoint(self, x: float, y: float, depth: float):
+        '''
+        Folds a single point's inverse-distance weights into the running
+        accumulators.
+        '''
+        dx = self._x - x
+        dy = self._y - y
+        w = 1.0 / (dx*dx + dy*dy + 1e-12)
+        self._idw_num += w * depth
+        self._idw_den += w
+        self._dirty = True
 
     def setColorMap(self, cmap: pg.ColorMap):
         '''Sets the colormap to be used to display the depth map.'''
         self._cmap = cmap
-
-    def addPoint(self, point: QtCore.QPoint | QtCore.QPointF, depth: float):
+        # quantize the colormap to a 256-entry LUT, indexed by depth value.
+        # it stays in the colormap's native R, G, B, A order: the QImage
+        # is created with a matching byte-order format, so no swap needed
+        self._cmap_lut = self._cmap.map(1 - np.arange(256)/255)
+        self._dirty = True
+
+    def addPoint(self, point: QtCore.QPoint | QtCore.QPointF, depth: float,
+                 update: bool = True):
         '''
         Adds a point with a corresponding depth value to the depth map.
+        If `update` is False, the displayed depth map is not recomputed;
+        the caller is then responsible for calling `updateDepthMap`.
         '''
         self._points.append(((point.x(), point.y()), depth))
-        self.updateDepthMap()
+        self._px = np.append(self._px, np.float32(point.x()))
+        self._py = np.append(self._py, np.float32(point.y()))
+        self._depths = np.append(self._depths, np.float32(depth))
+        self._foldPoint(point.x(), point.y(), depth)
+        if update:
+            self.updateDepthMap()
 
-    def undoPoint(self):
+    def undoPoint(self, update: bool = True):
         '''Undo the last point which has been added'''
         try:
             self._points.pop()
-            self.updateDepthMap()
+            self._px = self._px[:-1]
+            self._py = self._py[:-1]
+            self._depths = self._depths[:-1]
+            # re-fold the remaining points from scratch: subtracting the
+            # undone point's huge near-hit weights would catastrophically
+            # cancel the other points' contributions at that pixel
+            self._idw_num[:] = 0
+            self._idw_den[:] = 0
+            if len(self._points):
+                _idw_kernel(self._px, self._py, self._depths,
+                            self._idw_num, self._idw_den)
+            self._dirty = True
+            if update:
+                self.updateDepthMap()
         except IndexError:  # don't crash if empty
             pass
 
-    def clearPoints(self):
+    def clearPoints(self, update: bool = True):
         '''Removes all points from the depth map.'''
         self._points = list()
-        self.updateDepthMap()
+        self._px = np.empty(0, np.float32)
+        self._py = np.empty(0, np.float32)
+        self._depths = np.empty(0, np.float32)
+        self._idw_num[:] = 0
+        self._idw_den[:] = 0
+        self._dirty = True
+        if update:
+            self.updateDepthMap()
 
     def clear(self):
         '''Removes all points from the depth map and clears the displayed image.'''
@@ -126,38 +273,56 @@ class DepthViewer(ImageViewer):
         The depth map is created using the current set of points and displayed
         using the current colormap.
         '''
-        # check if we can even plot anything yet
-        if len(self._points) < 4:  # minimum 4 points for interpolation
-            self._depth_map = 255 * np.ones((self._image_size.height(),
-                                            self._image_size.width()),
-                                            np.uint8)
-            tmp_img = pg.makeQImage(self._depth_map, transpose=False)
-            self.setImage(tmp_img)
+        # neither the points nor the colormap have changed since the last
+        # computation, so the displayed result is still valid
+        if not self._dirty:
             return
+        self._dirty = False
 
-        # grab the points and depths from the current array
-        points, depths = zip(*self._points)
-        points = np.array(points)
-
-        # Get the image dimensions
-        height, width = self._image_size.height(), self._image_size.width()
-
-        # Create a grid of points to interpolate depth values
-        x, y = np.meshgrid(np.arange(width), np.arange(height))
-        z = griddata(points, depths, (x, y), fill_value=255)
-
-        # clip image values to allowable values
-        self._depth_map = np.clip(z, 0, 255, out=z).astype(np.uint8)
+        # check if we can even plot anything yet
+        if len(self._points) < 4:  # don't bother interpolating too few points
+            if self._blank_qimage is None:
+                # undoing commonly bounces off this branch, so the blank
+                # map is kept around once built
+                self._blank_array = 255 * np.ones((self._image_size.height(),
+                                                  self._image_size.width()),
+                                                  np.uint8)
+                # zero-copy view of the array (which stays alive on self)
+                self._blank_qimage = QtGui.QImage(
+                    self._blank_array.data,
+                    self._image_size.width(),
+                    self._image_size.height(),
+                    self._blank_array.strides[0],
+                    QtGui.QImage.Format.Format_Grayscale8)
+            self._generation += 1  # supersedes any in-flight compute
+            self._depth_map = self._blank_array
+            self.setImage(self._blank_qimage)
+            self.depthMapChanged.emit()
+            return
 
-        # Create a depth map image, using the colormap
-        # NOTE : the colormap has the B and R channels inverted, for some reason
-        depth_image = self._cmap.map(1 - (z/255))
-        depth_image = depth_image[:, :, [2, 1, 0, 3]]  # type: ignore
-        depth_image = pg.makeQImage(depth_image, transpose=False)
+        # hand the per-pixel work off to the worker thread; the
+        # accumulators are copied so that later point folds can't race
+        # a computation already underway
+        self.logger.debug("requesting depth image update")
+        self._generation += 1
+        self.requestCompute.emit(self._generation,
+                                 self._idw_num.copy(),
+                                 self._idw_den.copy(),
+                                 self._cmap_lut)
+
+    def _applyResult(self, generation: int,
+                     image: QtGui.QImage, depth_map: np.ndarray):
+        '''Takes over a depth map and image computed by the worker.'''
+        # drop stale results: a newer compute, blank map or image size
+        # has superseded them in the meantime
+        if generation != self._generation:
+            return
+        self._depth_map = depth_map
 
         # Set the depth map image
         self.logger.debug("updating depth image")
-        self.setImage(depth_image)
+        self.setImage(image)
+        self.depthMapChanged.emit()
 
         self.update()
 
@@ -167,6 +332,8 @@ class DepthViewer(ImageViewer):
 
 class MainWindow(QtWidgets.QMainWindow):
     ACCEPTED_FILETYPES = ('jpg', 'jpeg', 'png')
+    # pre-computed suffixes: dragEnterEvent fires at mouse-move rate
+    _ACCEPTED_SUFFIXES = tuple('.' + ext for ext in ACCEPTED_FILETYPES)
 
     def __init__(self,
                  parent: typing.Optional[QtWidgets.QWidget] = None,
@@ -174,6 +341,9 @@ class MainWindow(QtWidgets.QMainWindow):
         super().__init__(parent, flags)
         self.logger = logging.getLogger(self.__class__.__name__)
         self._filepath: str | None = None
+        self._img_gray: np.ndarray | None = None
+        self._depth_rgb: np.ndarray | None = None
+        self._depth_rgb_qimage: QtGui.QImage | None = None
 
         # allow dragging & dropping files
         self.setAcceptDrops(True)
@@ -189,8 +359,16 @@ class MainWindow(QtWidgets.QMainWindow):
         self._depth_image_viewer = ImageViewer(self)
         self._toolbar = QtWidgets.QToolBar('toolbar', self)
 
+        # coalesce rapid point entry into at most one heavy recompute
+        # of the depth views per ~frame
+        self._update_timer = QtCore.QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(16)
+        self._update_timer.timeout.connect(self._updateDepthViews)
+
         # functionality
         self._image_viewer.clicked_img.connect(self.addPoint)
+        self._depth_viewer.depthMapChanged.connect(self.createDepthImage)
 
         self._openImageAction = QtWidgets.QAction('&Open image')
         self._openImageAction.setIcon(self.style().standardIcon(
@@ -269,7 +447,7 @@ class MainWindow(QtWidgets.QMainWindow):
         return self
 
     def __exit__(self, *args):
-        pass
+        self._depth_viewer.stopWorker()
 
     def sizeHint(self) -> QtCore.QSize:
         return super().sizeHint().expandedTo(QtCore.QSize(700, 500))
@@ -293,7 +471,9 @@ class MainWindow(QtWidgets.QMainWindow):
         if event.mimeData().hasText():
             text = event.mimeData().text()
             text = text.removeprefix('file:///')
-            if os.path.isfile(text) and text.casefold().endswith(self.ACCEPTED_FILETYPES):
+            # cheap suffix check first, only then hit the filesystem
+            if (os.path.splitext(text)[1].lower() in self._ACCEPTED_SUFFIXES
+                    and os.path.isfile(text)):
                 return event.accept()
 
         # ignore everything else
@@ -316,7 +496,34 @@ class MainWindow(QtWidgets.QMainWindow):
         # set new image
         self._filepath = filepath
         self._image_viewer.setImage(filepath)
-        self._depth_viewer.setImageSize(self._image_viewer.image().size())
+
+        # maybe the file wasn't an image ?
+        if self._image_viewer.image().isNull():
+            self.logger.warning(f"could not load `{filepath}` as an image")
+            return
+
+        size = self._image_viewer.image().size()
+        self._depth_viewer.setImageSize(size)
+
+        # cache a grayscale copy of the source image; it doesn't change
+        # between clicks, so the conversion only needs to happen once
+        gray = self._image_viewer.image().convertToFormat(
+            QtGui.QImage.Format.Format_Grayscale8)
+        ptr = gray.bits()
+        ptr.setsize(gray.sizeInBytes())
+        self._img_gray = np.frombuffer(ptr, np.uint8).reshape(  # type: ignore
+            gray.height(), gray.bytesPerLine())[:, :gray.width()].copy()
+
+        # persistent buffer for the composite depth image; the grayscale
+        # channel never changes and is written here once, the third
+        # channel is never written at all and simply stays zero
+        self._depth_rgb = np.zeros((size.height(), size.width(), 3), np.uint8)
+        self._depth_rgb[..., 0] = self._img_gray
+        # zero-copy QImage view of the buffer, reused across updates
+        self._depth_rgb_qimage = QtGui.QImage(self._depth_rgb.data,
+                                              size.width(), size.height(),
+                                              self._depth_rgb.strides[0],
+                                              QtGui.QImage.Format.Format_RGB888)
 
     def addPoint(self, point: QtCore.QPoint | QtCore.QPointF, dist: int | None = None):
         if dist is None:  # get current values from slider
@@ -327,48 +534,49 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # add the point the the 2D image
         self._image_viewer.addPoint(point, color)
-        self._depth_viewer.addPoint(point, dist)
-        self.createDepthImage()
+        self._depth_viewer.addPoint(point, dist, update=False)
+        self._update_timer.start()
 
     def undoPoint(self):
         self._image_viewer.undoPoint()
-        self._depth_viewer.undoPoint()
-        self.createDepthImage()
+        self._depth_viewer.undoPoint(update=False)
+        self._update_timer.start()
 
     def clearPoints(self):
         self._image_viewer.clearPoints()
-        self._depth_viewer.clear()
-        self.createDepthImage()
+        self._depth_viewer.clearPoints(update=False)
+        self._update_timer.start()
+
+    def _updateDepthViews(self):
+        '''
+        recompute the depth map for the current points; the depth image
+        follows once the depthMapChanged signal comes back
+        '''
+        self._depth_viewer.updateDepthMap()
 
     def clear(self):
         self._image_viewer.clear()
         self._depth_viewer.clear()
         self._depth_image_viewer.clear()
+        self._img_gray = None
+        self._depth_rgb = None
+        self._depth_rgb_qimage = None
 
     def createDepthImage(self):
-        # retrieve the image
-        img = self._image_viewer.image()
-        img.convertTo(QtGui.QImage.Format.Format_Grayscale8)
-        ptr = img.bits()
-        ptr.setsize(img.height()*img.width())
-        img = np.frombuffer(ptr, np.uint8).reshape(  # type: ignore
-            img.height(), img.width())
-
-        # retrieve depth map
-        dpth = self._depth_viewer.depthmap()
-        if dpth is None:
-            dpth = 255*np.ones_like(img)
-
-        # null dimension, because we need three channels
-        null = np.zeros_like(dpth)
+        # nothing to compose if no image has been set yet
+        if self._depth_rgb is None:
+            return
 
-        # create the full 3-channel image
-        depth_image: QtGui.QImage = pg.makeQImage(
-            np.stack((img, dpth, null), axis=2),
-            transpose=False
-        )
+        # only the depth channel of the composite can have changed;
+        # overwrite it and re-show the cached QImage view of the buffer
+        dpth = self._depth_viewer.depthmap()
+        if dpth is not None and dpth.shape != self._depth_rgb.shape[:2]:
+            # stale map from a previous image; don't compose garbage
+            self.logger.debug("depth map doesn't match the current image")
+            return
+        self._depth_rgb[..., 1] = 255 if dpth is None else dpth
 
-        self._depth_image_viewer.setImage(depth_image)
+        self._depth_image_viewer.setImage(self._depth_rgb_qimage)
 
     def exportDepthMap(self):
         if self._filepath is None:
@@ -394,10 +602,11 @@ class MainWindow(QtWidgets.QMainWindow):
             return
 
         # retrieve the depth map
-        depth_image: QtGui.QImage = pg.makeQImage(
-            self._depth_viewer.depthmap(),
-            transpose=False
-        )
+        dpth = self._depth_viewer.depthmap()
+        depth_image = QtGui.QImage(dpth.data,
+                                   dpth.shape[1], dpth.shape[0],
+                                   dpth.strides[0],
+                                   QtGui.QImage.Format.Format_Grayscale8)
 
         # save
         self.logger.debug(f"exporting depth map to {newfilepath}")
@@ -28,8 +28,9 @@ class ImageViewer(QtWidgets.QFrame):
                  flags: typing.Union[QtCore.Qt.WindowFlags, QtCore.Qt.WindowType] = QtCore.Qt.WindowType.Widget) -> None:
         super().__init__(parent, flags)
         self.logger = logging.getLogger(self.__class__.__name__)
-        self._image = QtGui.QImage()
-        self._scaled_image = QtGui.QImage()  # caching the scaled image
+        self._image = QtGui.QImage()  # kept only for pixel readout
+        self._src_pixmap = QtGui.QPixmap()  # the same image, on the paint side
+        self._scaled_pixmap = QtGui.QPixmap()  # caching the scaled image
         self._rect = QtCore.QRect()
         self.setContentsMargins(*4*[9])
 
@@ -50,24 +51,36 @@ class ImageViewer(QtWidgets.QFrame):
         else:
             raise TypeError(
                 f"expected an QImage or an image path, not `{type(image)}`")
+        self._src_pixmap = QtGui.QPixmap.fromImage(self._image)
         self.clearCache()
         self.update()
 
     def clear(self):
         '''Clears the currently displayed image from the widget.'''
         self._image = QtGui.QImage()
+        self._src_pixmap = QtGui.QPixmap()
         self.clearCache()
         self.update()
 
     def clearCache(self, drawnow: bool = False):
         '''clear internal cache of the scaled image. This forces the image to be re-scaled on next draw'''
-        self._scaled_image = QtGui.QImage()
+        self._scaled_pixmap = QtGui.QPixmap()
         if drawnow:
             self.repaint()
 
     def resizeEvent(self, a0: QtGui.QResizeEvent) -> None:
-        # clear the cached scaled image
-        self.clearCache()
+        # ignore spurious resize events (dock rearrangement, toolbar toggles)
+        if a0.size() == a0.oldSize():
+            return super().resizeEvent(a0)
+
+        # only re-scale the image if the target size actually changed
+        target = self._image.size().scaled(
+            self.contentsRect().size(),
+            QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        if not self._scaled_pixmap.isNull() and self._scaled_pixmap.size() == target:
+            self._rect.moveCenter(self.contentsRect().center())
+        else:
+            self.clearCache()
         return super().resizeEvent(a0)
 
     def paintEvent(self, event: QtGui.QPaintEvent) -> None:
@@ -78,21 +91,23 @@ class ImageViewer(QtWidgets.QFrame):
         if self._image.isNull():
             return
 
-        # re-create scaled image if cache has been cleared
-        if self._scaled_image.isNull():
-            self._scaled_image = self._image.scaled(
+        # re-create scaled pixmap if cache has been cleared; scaling and
+        # blitting pixmaps goes through the platform's paint backend,
+        # which is faster than doing either on the QImage side
+        if self._scaled_pixmap.isNull():
+            self._scaled_pixmap = self._src_pixmap.scaled(
                 self.contentsRect().size(),
                 QtCore.Qt.AspectRatioMode.KeepAspectRatio,
                 QtCore.Qt.TransformationMode.SmoothTransformation
             )
 
-            self._rect.setSize(self._scaled_image.size())
+            self._rect.setSize(self._scaled_pixmap.size())
             self._rect.moveCenter(self.contentsRect().center())
 
         # paint the scaled image
         with QtGui.QPainter(self) as p:
             p: QtGui.QPainter
-            p.drawImage(self._rect, self._scaled_image)
+            p.drawPixmap(self._rect, self._scaled_pixmap)
 
 
 class ClickableImageViewer(ImageViewer):